@@ -1,13 +1,26 @@
-from flask import Flask, render_template, jsonify, request, send_file
+from flask import Flask, render_template, jsonify, request, send_file, Response, stream_with_context, make_response
 from flask_socketio import SocketIO, emit, join_room, leave_room
+from werkzeug.middleware.proxy_fix import ProxyFix
 import uuid
+import hashlib
+import hmac
+import secrets
 import time
 import os
+import math
+import threading
+import functools
+import inspect
+import re
+import csv
+import io
+import json
+import zlib
 import importlib.util
 import sys
 import tempfile
 import zipfile
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from typing import List
 import shutil
 
@@ -28,27 +41,390 @@ app = Flask("Beamer+",
             template_folder=BASE_PATH)
 socketio = SocketIO(app, cors_allowed_origins='*', async_mode='threading')
 
+# Number of trusted reverse proxies in front of the server. When set, client
+# addresses (used for rate limiting) are taken from X-Forwarded-For.
+PROXY_HOPS = int(os.environ.get('BEAMER_PROXY_HOPS', '0'))
+if PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS)
+
 # Store active surveys and responses
 surveys = {}
 survey_responses = defaultdict(list)
+survey_analyses = {}  # Most recent analysis result per survey
+
+EXPORT_BATCH_ROWS = 500
+EXPORT_CSV_FIELDS = ['record_type', 'session_id', 'survey_id', 'question', 'survey_created_at', 'model',
+                     'active', 'timestamp', 'response', 'summary', 'num_respondents']
+
+# Near-duplicate detection: MinHash over word shingles, banded for lookup
+MINHASH_NUM_HASHES = 32
+MINHASH_BANDS = 8
+NEAR_DUPLICATE_THRESHOLD = 0.85
+# Words whose presence flips or pins down a response's meaning; responses only
+# merge if they agree on these exactly ("t" is what remains of "n't")
+NEGATION_WORDS = {'not', 'no', 'never', 'nor', 'none', 'nothing', 'neither', 'without',
+                  'cannot', 't', 'dont', 'didnt', 'doesnt', 'isnt', 'wasnt', 'cant', 'wont'}
+
+class ResponseIndex:
+    """
+    Incremental index of survey responses that collapses near-duplicates.
+    Each cluster keeps its first response as the representative and a weight
+    counting how many responses it absorbed.
+    """
+
+    def __init__(self):
+        self.clusters = []  # dicts with 'text', 'weight', 'signature', 'shingles' and 'guard'
+        self.exact = {}  # normalized text -> cluster index
+        self.bands = defaultdict(list)  # (band, band hash) -> cluster indices
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text):
+        """Lowercase, strip punctuation and collapse whitespace"""
+        return ' '.join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+
+    @staticmethod
+    def shingles(normalized):
+        """Word unigrams and bigrams of a normalized response"""
+        words = normalized.split()
+        return frozenset(words) | frozenset(zip(words, words[1:]))
+
+    @staticmethod
+    def guard(normalized):
+        """Negations and numbers, which must match for two responses to merge"""
+        words = normalized.split()
+        return (frozenset(w for w in words if w in NEGATION_WORDS),
+                tuple(w for w in words if any(c.isdigit() for c in w)))
+
+    @staticmethod
+    def signature(shingles):
+        """MinHash signature of a response's shingles"""
+        return tuple(min((hash((seed, shingle)) for shingle in shingles), default=0)
+                     for seed in range(MINHASH_NUM_HASHES))
+
+    def add(self, text):
+        """Add a response, merging it into an existing cluster if it is a near-duplicate"""
+        normalized = self.normalize(text)
+        with self.lock:
+            if normalized in self.exact:
+                self.clusters[self.exact[normalized]]['weight'] += 1
+                return
+
+            shingles = self.shingles(normalized)
+            guard = self.guard(normalized)
+            sig = self.signature(shingles)
+            rows = MINHASH_NUM_HASHES // MINHASH_BANDS
+            band_keys = [(b, hash(sig[b * rows:(b + 1) * rows])) for b in range(MINHASH_BANDS)]
+
+            # MinHash bands only find candidates; merging uses the exact Jaccard similarity
+            best, best_similarity = None, NEAR_DUPLICATE_THRESHOLD
+            for idx in {i for key in band_keys for i in self.bands[key]}:
+                cluster = self.clusters[idx]
+                if cluster['guard'] != guard or not shingles:
+                    continue
+                similarity = len(shingles & cluster['shingles']) / len(shingles | cluster['shingles'])
+                if similarity >= best_similarity:
+                    best, best_similarity = idx, similarity
+
+            if best is None:
+                best = len(self.clusters)
+                self.clusters.append({'text': text, 'weight': 0, 'signature': sig,
+                                      'shingles': shingles, 'guard': guard})
+                for key in band_keys:
+                    self.bands[key].append(best)
+            self.clusters[best]['weight'] += 1
+            self.exact[normalized] = best
+
+    def representatives(self):
+        """Get the representative texts and their weights, heaviest first"""
+        with self.lock:
+            clusters = sorted(self.clusters, key=lambda c: c['weight'], reverse=True)
+        return [c['text'] for c in clusters], [c['weight'] for c in clusters]
 
-# Store current presentation
+    def __len__(self):
+        return len(self.clusters)
+
+survey_indexes = {}  # Survey id -> ResponseIndex, created with the survey
+
+def accepts_weights(model_func):
+    """Check whether a model's summarize function takes a `weights` argument"""
+    try:
+        return 'weights' in inspect.signature(model_func).parameters
+    except (TypeError, ValueError):
+        return False
+
+# Store presentation sessions; each hosts one talk with its own rooms and surveys
 UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-current_presentation = {
-    'file': None,
-    'config': None,
-    'models': {},  # Store loaded model functions
-    'available_models': []  # List of available model names
+DEFAULT_SESSION = 'default'
+MAX_SESSIONS = int(os.environ.get('BEAMER_MAX_SESSIONS', '50'))  # Including the default session
+
+# Presenter key of the default session. Kept in the environment so the debug
+# reloader's child process uses the same key as the parent that printed it.
+DEFAULT_PRESENTER_KEY = os.environ.setdefault('BEAMER_PRESENTER_KEY', secrets.token_urlsafe(16))
+
+def new_session(presenter_key=None):
+    return {
+        'created_at': time.time(),
+        'presenter_key': presenter_key or secrets.token_urlsafe(16),  # Secret required to present
+        'presenter_sid': None,  # Socket.IO session id of the connected presenter
+        'surveys': [],  # Ids of surveys created in this session
+        'presentation': {
+            'file': None,
+            'config': None,
+            'models': {},  # Store loaded model functions
+            'model_hashes': {},  # Model name -> content hash in model_cache
+            'available_models': []  # List of available model names
+        }
+    }
+
+sessions = {DEFAULT_SESSION: new_session(DEFAULT_PRESENTER_KEY)}
+socket_sessions = {}  # Socket.IO session id -> presentation session id
+
+def has_presenter_key(session_id, key=None):
+    """
+    Check a presenter key against a session's. Without an explicit key, the
+    request's X-Presenter-Key header or `key` query parameter is used.
+    """
+    if key is None:
+        key = request.headers.get('X-Presenter-Key') or request.args.get('key', '')
+    session = sessions.get(session_id)
+    return session is not None and isinstance(key, str) and hmac.compare_digest(key.encode(), session['presenter_key'].encode())
+
+def session_room(session_id, role):
+    """Get the Socket.IO room name for a role ('presenter' or 'viewer') in a session"""
+    return f'{session_id}:{role}'
+
+# Loaded model modules, shared by every session that uploads identical source
+model_cache = {}  # SHA-256 of source -> {'summarize', 'module_name', 'temp_dir', 'refs'}
+model_load_locks = {}  # SHA-256 of source -> lock held while that source loads
+model_cache_lock = threading.Lock()
+
+def acquire_model(model_hash, load):
+    """
+    Get the cached model for `model_hash`, taking a reference to it.
+    On a miss, `load()` builds the entry (or returns None) without holding
+    model_cache_lock, so a slow import only blocks uploads of the same source.
+    """
+    with model_cache_lock:
+        entry = model_cache.get(model_hash)
+        if entry is not None:
+            entry['refs'] += 1
+            return entry
+        load_lock = model_load_locks.setdefault(model_hash, threading.Lock())
+    
+    with load_lock:
+        # Another upload may have loaded the same source while we waited
+        with model_cache_lock:
+            entry = model_cache.get(model_hash)
+            if entry is not None:
+                entry['refs'] += 1
+                return entry
+        try:
+            entry = load()
+            if entry is not None:
+                with model_cache_lock:
+                    model_cache[model_hash] = entry
+            return entry
+        finally:
+            with model_cache_lock:
+                model_load_locks.pop(model_hash, None)
+
+def release_models(model_hashes):
+    """Drop one reference to each cached model, unloading those no longer used"""
+    with model_cache_lock:
+        for model_hash in model_hashes:
+            entry = model_cache.get(model_hash)
+            if entry is None:
+                continue
+            entry['refs'] -= 1
+            if entry['refs'] <= 0:
+                del model_cache[model_hash]
+                sys.modules.pop(entry['module_name'], None)
+                shutil.rmtree(entry['temp_dir'], ignore_errors=True)
+
+def session_memory_usage(session_id):
+    """
+    Approximate the memory held by a session, in bytes.
+    Shared model modules are listed by hash rather than attributed to the session.
+    """
+    session = sessions[session_id]
+    response_bytes = 0
+    index_bytes = 0
+    num_responses = 0
+    for survey_id in session['surveys']:
+        responses = survey_responses.get(survey_id, [])
+        num_responses += len(responses)
+        for i in range(len(responses)):
+            response_bytes += sys.getsizeof(responses[i]) + sys.getsizeof(responses[i]['text'])
+        index = survey_indexes.get(survey_id)
+        if index is not None:
+            for cluster in list(index.clusters):
+                index_bytes += (sys.getsizeof(cluster) + sys.getsizeof(cluster['signature'])
+                                + MINHASH_NUM_HASHES * sys.getsizeof(0)
+                                + sys.getsizeof(cluster['shingles']))
+    
+    presentation_file = session['presentation']['file']
+    return {
+        'num_surveys': len(session['surveys']),
+        'num_responses': num_responses,
+        'response_bytes': response_bytes,
+        'index_bytes': index_bytes,
+        'total_bytes': response_bytes + index_bytes,
+        'upload_bytes': os.path.getsize(presentation_file) if presentation_file and os.path.exists(presentation_file) else 0,
+        'shared_models': sorted(set(session['presentation']['model_hashes'].values()))
+    }
+
+# Admission control: token-bucket rate limits per client and event type.
+# Each entry is (tokens per second, burst capacity).
+RATE_LIMITS = {
+    'respond': (0.2, 3),  # Per browser (CLIENT_COOKIE), or per address without the cookie
+    'respond_address': (2, 100),  # Per address, generous enough for a shared NAT
+    # Per address, so reconnecting does not refill them; sized for a shared NAT
+    'connect': (5, 200),
+    'join': (5, 200),
+    'presentation_loaded': (1, 5),
+    'slide_change': (10, 20),
+    'annotation_update': (10, 20),
+    'clear_annotations': (5, 10),
+    'video_action': (5, 10),
+    'model_interaction': (30, 60),
+    'survey_show': (1, 5),
+    'survey_close': (1, 5),
 }
+RATE_BUCKET_MAX = 10000  # Least recently used buckets are evicted beyond this
+CLIENT_COOKIE = 'beamer_client'  # Random per-browser token identifying survey respondents
+REJECTION_NOTICE_INTERVAL = 1.0  # Minimum seconds between event_rejected replies to a client
+
+class TokenBucket:
+    """Token bucket refilling at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def consume(self, tokens=1):
+        """
+        Take tokens from the bucket.
+        Returns 0 if admitted, otherwise the seconds until enough tokens refill.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0
+        return (tokens - self.tokens) / self.rate
+
+rate_buckets = OrderedDict()  # (kind, client) -> TokenBucket, least recently used first
+rate_rejections = defaultdict(int)
+rate_notices = {}  # Socket.IO session id -> time of the last event_rejected reply
+rate_lock = threading.Lock()
+
+def check_rate_limit(kind, client):
+    """
+    Admit one `kind` event from `client` (an IP address or socket session id).
+    Returns 0 if admitted, otherwise the number of seconds to wait before retrying.
+    """
+    rate, capacity = RATE_LIMITS[kind]
+    with rate_lock:
+        bucket = rate_buckets.get((kind, client))
+        if bucket is None:
+            bucket = rate_buckets[(kind, client)] = TokenBucket(rate, capacity)
+            if len(rate_buckets) > RATE_BUCKET_MAX:
+                rate_buckets.popitem(last=False)
+        else:
+            rate_buckets.move_to_end((kind, client))
+        retry_after = bucket.consume()
+        if retry_after:
+            rate_rejections[kind] += 1
+        return retry_after
+
+def notify_rejection(kind, reason, **details):
+    """
+    Tell the current client an event was dropped, at most once per
+    REJECTION_NOTICE_INTERVAL so a flood of drops does not double the traffic.
+    """
+    now = time.monotonic()
+    with rate_lock:
+        if now - rate_notices.get(request.sid, -REJECTION_NOTICE_INTERVAL) < REJECTION_NOTICE_INTERVAL:
+            return
+        rate_notices[request.sid] = now
+    emit('event_rejected', dict(details, event=kind, reason=reason))
+
+def admit_socket_event(kind, presenter_only=True, per_address=False):
+    """
+    Decorator for Socket.IO handlers that drops events from clients other than
+    the presenter of their session and from clients exceeding the rate limit for `kind`.
+    Limits apply per connection, or per client address if `per_address` is set.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            session = sessions.get(socket_sessions.get(request.sid))
+            if presenter_only and (session is None or session['presenter_sid'] != request.sid):
+                with rate_lock:
+                    rate_rejections['not_presenter'] += 1
+                notify_rejection(kind, 'not_presenter')
+                return
+            client = request.remote_addr if per_address else request.sid
+            retry_after = check_rate_limit(kind, client)
+            if retry_after:
+                notify_rejection(kind, 'rate_limited', retry_after=retry_after)
+                return
+            return handler(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def load_model_module(zip_ref, ai_file, model_name, model_hash):
+    """Extract one model file from the ZIP and import it, returning a model_cache entry"""
+    # Extract the file; the directory is kept until the model is unloaded
+    temp_dir = tempfile.mkdtemp()
+    zip_ref.extract(ai_file, temp_dir)
+    
+    # Full path to the extracted file
+    model_path = os.path.join(temp_dir, ai_file)
+    
+    # Load the model function
+    spec = importlib.util.spec_from_file_location(model_name, model_path)
+    module = importlib.util.module_from_spec(spec)
+    
+    # Add to sys.modules with a name unique to the source
+    unique_name = f"ai_model_{model_name}_{model_hash[:12]}"
+    sys.modules[unique_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[unique_name]
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    
+    # Check if the summarize function exists
+    if not hasattr(module, 'summarize'):
+        del sys.modules[unique_name]
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        print(f"Warning: {ai_file} does not define a 'summarize' function")
+        return None
+    
+    print(f"Loaded model: {model_name}")
+    return {
+        'summarize': getattr(module, 'summarize'),
+        'module_name': unique_name,
+        'temp_dir': temp_dir,
+        'refs': 1
+    }
 
 def extract_and_load_models(zip_path):
     """
     Extract AI models from the uploaded ZIP file and load them.
     Models should be in the 'ai/' directory within the ZIP.
+    Models whose source was already loaded by any session are reused from model_cache.
     """
     models = {}
+    model_hashes = {}
     available_models = []
     
     try:
@@ -58,16 +434,10 @@ def extract_and_load_models(zip_path):
             
             if not ai_files:
                 print("No AI models found in ZIP file")
-                return models, available_models
-            
-            # Create a temporary directory to extract models
-            temp_dir = tempfile.mkdtemp()
+                return models, model_hashes, available_models
             
             for ai_file in ai_files:
                 try:
-                    # Extract the file
-                    zip_ref.extract(ai_file, temp_dir)
-                    
                     # Get model name from filename
                     model_name = os.path.splitext(os.path.basename(ai_file))[0]
                     
@@ -75,68 +445,155 @@ def extract_and_load_models(zip_path):
                     if model_name.startswith('_'):
                         continue
                     
-                    # Full path to the extracted file
-                    model_path = os.path.join(temp_dir, ai_file)
+                    model_hash = hashlib.sha256(zip_ref.read(ai_file)).hexdigest()
                     
-                    # Load the model function
-                    spec = importlib.util.spec_from_file_location(model_name, model_path)
-                    module = importlib.util.module_from_spec(spec)
-                    
-                    # Add to sys.modules with unique name
-                    unique_name = f"ai_model_{model_name}_{int(time.time())}"
-                    sys.modules[unique_name] = module
-                    spec.loader.exec_module(module)
+                    entry = acquire_model(model_hash, functools.partial(
+                        load_model_module, zip_ref, ai_file, model_name, model_hash))
+                    if entry is None:
+                        continue
                     
-                    # Check if the summarize function exists
-                    if hasattr(module, 'summarize'):
-                        models[model_name] = getattr(module, 'summarize')
-                        available_models.append(model_name)
-                        print(f"Loaded model: {model_name}")
-                    else:
-                        print(f"Warning: {ai_file} does not define a 'summarize' function")
+                    models[model_name] = entry['summarize']
+                    model_hashes[model_name] = model_hash
+                    available_models.append(model_name)
                 
                 except Exception as e:
                     print(f"Error loading model {ai_file}: {str(e)}")
-            
-            # Don't delete temp_dir immediately - keep it for the session
-            # We could implement cleanup on server shutdown if needed
     
     except Exception as e:
         print(f"Error extracting models from ZIP: {str(e)}")
     
-    return models, available_models
+    return models, model_hashes, available_models
 
-@app.route('/')
-def index():
+@app.route('/', defaults={'session_id': DEFAULT_SESSION})
+@app.route('/s/<session_id>')
+def index(session_id):
+    if session_id not in sessions:
+        return jsonify({'error': 'Session not found'}), 404
     return render_template('index.html')
 
-@app.route("/viewer")
-def viewer():
+@app.route("/viewer", defaults={'session_id': DEFAULT_SESSION})
+@app.route("/s/<session_id>/viewer")
+def viewer(session_id):
+    if session_id not in sessions:
+        return jsonify({'error': 'Session not found'}), 404
     return render_template("viewer.html")
 
 @app.route("/survey/<survey_id>")
 def survey_page(survey_id):
     if survey_id not in surveys:
         return render_template("survey_not_found.html"), 404
-    return render_template("survey_response.html", survey_id=survey_id)
+    response = make_response(render_template("survey_response.html", survey_id=survey_id))
+    if CLIENT_COOKIE not in request.cookies:
+        response.set_cookie(CLIENT_COOKIE, secrets.token_urlsafe(16), max_age=30 * 24 * 3600,
+                            httponly=True, samesite='Lax')
+    return response
+
+# Session endpoints
+@app.route('/api/session/create', methods=['POST'])
+def create_session():
+    """
+    Create a session with its own presenter key.
+    Requires the default session's presenter key, which belongs to the server operator,
+    since presenters of a session can upload model code that the server runs.
+    """
+    if not has_presenter_key(DEFAULT_SESSION):
+        return jsonify({'error': 'Presenter key required'}), 403
+    if len(sessions) >= MAX_SESSIONS:
+        return jsonify({'error': f'Session limit of {MAX_SESSIONS} reached'}), 503
+    
+    session_id = str(uuid.uuid4())[:8]
+    sessions[session_id] = new_session()
+    presenter_key = sessions[session_id]['presenter_key']
+    return jsonify({
+        'session_id': session_id,
+        'presenter_key': presenter_key,
+        'url': f'/s/{session_id}?key={presenter_key}',
+        'viewer_url': f'/s/{session_id}/viewer'
+    })
+
+@app.route('/api/sessions')
+def get_sessions():
+    """
+    Get every hosted session with its approximate memory usage.
+    Requires the default session's presenter key, which belongs to the server operator.
+    """
+    if not has_presenter_key(DEFAULT_SESSION):
+        return jsonify({'error': 'Presenter key required'}), 403
+    return jsonify({
+        'sessions': {session_id: session_memory_usage(session_id) for session_id in list(sessions)},
+        'shared_models': len(model_cache)
+    })
+
+@app.route('/api/session/<session_id>')
+def get_session(session_id):
+    if session_id not in sessions:
+        return jsonify({'error': 'Session not found'}), 404
+    if not has_presenter_key(session_id):
+        return jsonify({'error': 'Presenter key required'}), 403
+    session = sessions[session_id]
+    return jsonify({
+        'created_at': session['created_at'],
+        'presenter_connected': session['presenter_sid'] is not None,
+        'models': session['presentation']['available_models'],
+        'surveys': session['surveys'],
+        'memory': session_memory_usage(session_id)
+    })
+
+@app.route('/api/session/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    """
+    End a session, freeing its surveys, uploaded file and model references.
+    Requires the session's presenter key or the server operator's.
+    """
+    if session_id == DEFAULT_SESSION:
+        return jsonify({'error': 'The default session cannot be deleted'}), 400
+    if session_id not in sessions:
+        return jsonify({'error': 'Session not found'}), 404
+    if not (has_presenter_key(session_id) or has_presenter_key(DEFAULT_SESSION)):
+        return jsonify({'error': 'Presenter key required'}), 403
+    session = sessions.pop(session_id, None)
+    if session is None:
+        return jsonify({'error': 'Session not found'}), 404
+    
+    presentation = session['presentation']
+    release_models(presentation['model_hashes'].values())
+    if presentation['file'] and os.path.exists(presentation['file']):
+        os.remove(presentation['file'])
+    for survey_id in session['surveys']:
+        surveys.pop(survey_id, None)
+        survey_responses.pop(survey_id, None)
+        survey_indexes.pop(survey_id, None)
+        survey_analyses.pop(survey_id, None)
+    
+    socketio.emit('session_ended', {'session_id': session_id}, room=session_room(session_id, 'presenter'))
+    socketio.emit('session_ended', {'session_id': session_id}, room=session_room(session_id, 'viewer'))
+    return jsonify({'success': True})
 
 # Presentation endpoints
-@app.route('/api/presentation/upload', methods=['POST'])
-def upload_presentation():
-    global current_presentation
+@app.route('/api/presentation/upload', methods=['POST'], defaults={'session_id': DEFAULT_SESSION})
+@app.route('/api/session/<session_id>/presentation/upload', methods=['POST'])
+def upload_presentation(session_id):
+    if session_id not in sessions:
+        return jsonify({'error': 'Session not found'}), 404
+    if not has_presenter_key(session_id):
+        return jsonify({'error': 'Presenter key required'}), 403
     if 'file' not in request.files:
         return jsonify({'error': 'No file'}), 400
     
     file = request.files['file']
-    filepath = os.path.join(UPLOAD_FOLDER, 'current.zip')
+    filepath = os.path.join(UPLOAD_FOLDER, f'{session_id}.zip')
     file.save(filepath)
     
     # Extract and load AI models from the ZIP
-    models, available_models = extract_and_load_models(filepath)
+    models, model_hashes, available_models = extract_and_load_models(filepath)
     
-    current_presentation['file'] = filepath
-    current_presentation['models'] = models
-    current_presentation['available_models'] = available_models
+    presentation = sessions[session_id]['presentation']
+    previous_hashes = presentation['model_hashes'].values()
+    presentation['file'] = filepath
+    presentation['models'] = models
+    presentation['model_hashes'] = model_hashes
+    presentation['available_models'] = available_models
+    release_models(previous_hashes)
     
     print(f"Presentation uploaded with {len(available_models)} AI models")
     
@@ -146,41 +603,58 @@ def upload_presentation():
         'models': available_models
     })
 
-@app.route('/api/presentation/current')
-def get_current_presentation():
-    if current_presentation['file'] and os.path.exists(current_presentation['file']):
-        return send_file(current_presentation['file'], as_attachment=True, download_name='presentation.zip')
+@app.route('/api/presentation/current', defaults={'session_id': DEFAULT_SESSION})
+@app.route('/api/session/<session_id>/presentation/current')
+def get_current_presentation(session_id):
+    if session_id not in sessions:
+        return jsonify({'error': 'Session not found'}), 404
+    presentation = sessions[session_id]['presentation']
+    if presentation['file'] and os.path.exists(presentation['file']):
+        return send_file(presentation['file'], as_attachment=True, download_name='presentation.zip')
     return jsonify({'error': 'No presentation loaded'}), 404
 
 # Model endpoints
-@app.route('/api/models')
-def get_models():
-    """Get list of available AI models from the current presentation"""
+@app.route('/api/models', defaults={'session_id': DEFAULT_SESSION})
+@app.route('/api/session/<session_id>/models')
+def get_models(session_id):
+    """Get list of available AI models from the session's presentation"""
+    if session_id not in sessions:
+        return jsonify({'error': 'Session not found'}), 404
     return jsonify({
-        'models': current_presentation.get('available_models', [])
+        'models': sessions[session_id]['presentation'].get('available_models', [])
     })
 
 # API endpoints for surveys
-@app.route('/api/survey/create', methods=['POST'])
-def create_survey():
+@app.route('/api/survey/create', methods=['POST'], defaults={'session_id': DEFAULT_SESSION})
+@app.route('/api/session/<session_id>/survey/create', methods=['POST'])
+def create_survey(session_id):
+    if session_id not in sessions:
+        return jsonify({'error': 'Session not found'}), 404
+    if not has_presenter_key(session_id):
+        return jsonify({'error': 'Presenter key required'}), 403
+    
     data = request.json
     survey_id = str(uuid.uuid4())[:8]
     
     model_name = data.get('model', None)
     
     # Validate that the model exists
-    if model_name and model_name not in current_presentation.get('models', {}):
+    if model_name and model_name not in sessions[session_id]['presentation'].get('models', {}):
         return jsonify({
             'error': f'Model "{model_name}" not found in current presentation'
         }), 400
     
+    # Create the index before the survey becomes visible to respond_survey
+    survey_indexes[survey_id] = ResponseIndex()
     surveys[survey_id] = {
+        'session_id': session_id,
         'question': data.get('question', 'What do you think?'),
         'created_at': time.time(),
         'active': True,
         'model': model_name,
         'num_summaries': data.get('num_summaries', 3)
     }
+    sessions[session_id]['surveys'].append(survey_id)
     return jsonify({'survey_id': survey_id, 'url': f'/survey/{survey_id}'})
 
 @app.route('/api/survey/<survey_id>')
@@ -197,19 +671,40 @@ def respond_survey(survey_id):
     if not surveys[survey_id]['active']:
         return jsonify({'error': 'Survey is closed'}), 403
     
-    data = request.json
+    # Cap each address overall, so clients cannot escape the limit by discarding the
+    # cookie, then limit each browser. The address cap goes first so that rejected
+    # clients cannot create cookie buckets.
+    retry_after = (check_rate_limit('respond_address', request.remote_addr)
+                   or check_rate_limit('respond', request.cookies.get(CLIENT_COOKIE) or request.remote_addr))
+    if retry_after:
+        response = jsonify({'error': 'Too many responses, please try again later'})
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        return response, 429
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    text = data.get('response', '')
+    if text is None:
+        text = ''
+    elif isinstance(text, (int, float)):
+        text = str(text)
+    elif not isinstance(text, str):
+        return jsonify({'error': 'Response must be a string'}), 400
+    
     response = {
-        'text': data.get('response', ''),
+        'text': text,
         'timestamp': time.time()
     }
     survey_responses[survey_id].append(response)
+    survey_indexes[survey_id].add(response['text'])
     
     # Notify presenter of new response
     socketio.emit('survey_response', {
         'survey_id': survey_id,
         'response': response,
         'total': len(survey_responses[survey_id])
-    }, room='presenter')
+    }, room=session_room(surveys[survey_id]['session_id'], 'presenter'))
     
     return jsonify({'success': True})
 
@@ -217,6 +712,8 @@ def respond_survey(survey_id):
 def get_responses(survey_id):
     if survey_id not in surveys:
         return jsonify({'error': 'Survey not found'}), 404
+    if not has_presenter_key(surveys[survey_id]['session_id']):
+        return jsonify({'error': 'Presenter key required'}), 403
     return jsonify({
         'responses': survey_responses[survey_id],
         'total': len(survey_responses[survey_id])
@@ -229,6 +726,8 @@ def analyze_survey(survey_id):
     """
     if survey_id not in surveys:
         return jsonify({'error': 'Survey not found'}), 404
+    if not has_presenter_key(surveys[survey_id]['session_id']):
+        return jsonify({'error': 'Presenter key required'}), 403
     
     survey = surveys[survey_id]
     responses = survey_responses[survey_id]
@@ -242,18 +741,26 @@ def analyze_survey(survey_id):
     if not model_name:
         return jsonify({'error': 'No model specified for this survey'}), 400
     
-    # Get the model function from loaded models
-    model_func = current_presentation.get('models', {}).get(model_name)
+    # Get the model function from the session's loaded models
+    session = sessions.get(survey['session_id'])
+    if session is None:
+        return jsonify({'error': 'Session not found'}), 404
+    model_func = session['presentation'].get('models', {}).get(model_name)
     
     if not model_func:
         return jsonify({'error': f'Model "{model_name}" not loaded'}), 404
     
     try:
-        # Extract response texts
-        response_texts = [r['text'] for r in responses]
-        
-        # Call the summarize function
-        summaries = model_func(response_texts, num_summaries)
+        if accepts_weights(model_func):
+            # Send one representative per group of near-duplicate responses
+            response_texts, weights = survey_indexes[survey_id].representatives()
+            # There cannot be more themes than distinct ideas
+            num_summaries = min(num_summaries, len(response_texts))
+            summaries = model_func(response_texts, num_summaries, weights=weights)
+        else:
+            # Extract response texts
+            response_texts = [r['text'] for r in responses]
+            summaries = model_func(response_texts, num_summaries)
         
         # Validate the output
         if not isinstance(summaries, list):
@@ -284,37 +791,247 @@ def analyze_survey(survey_id):
             for s in summaries
         ]
         
-        return jsonify({
+        result = {
             'summaries': summaries_json,
             'model': model_name,
-            'num_responses': len(responses)
-        })
+            'num_responses': len(responses),
+            'num_distinct': len(survey_indexes[survey_id])
+        }
+        survey_analyses[survey_id] = dict(result, analyzed_at=time.time())
+        
+        return jsonify(result)
     
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({'error': f'Error analyzing responses: {str(e)}'}), 500
 
+def generate_export_records(survey_ids, since, until):
+    """
+    Yield survey, response and analysis records one at a time.
+    Response and summary records are kept only if their time lies in
+    [since, until). A survey's record is emitted whenever any of its responses
+    or summaries are, or, without a time range, always. Responses appended
+    while the export runs are left out.
+    """
+    def in_range(timestamp):
+        return (since is None or timestamp >= since) and (until is None or timestamp < until)
+    
+    for survey_id in survey_ids:
+        survey = surveys.get(survey_id)
+        if survey is None:
+            continue
+        responses = survey_responses[survey_id]
+        num_responses = len(responses)
+        analysis = survey_analyses.get(survey_id)
+        include_analysis = analysis is not None and in_range(analysis['analyzed_at'])
+        
+        if ((since is None and until is None) or include_analysis
+                or any(in_range(responses[i]['timestamp']) for i in range(num_responses))):
+            yield {
+                'record_type': 'survey',
+                'session_id': survey['session_id'],
+                'survey_id': survey_id,
+                'question': survey['question'],
+                'survey_created_at': survey['created_at'],
+                'model': survey['model'],
+                'active': survey['active']
+            }
+        
+        for i in range(num_responses):
+            timestamp = responses[i]['timestamp']
+            if not in_range(timestamp):
+                continue
+            yield {
+                'record_type': 'response',
+                'survey_id': survey_id,
+                'timestamp': timestamp,
+                'response': responses[i]['text']
+            }
+        
+        if include_analysis:
+            for summary in analysis['summaries']:
+                yield {
+                    'record_type': 'summary',
+                    'survey_id': survey_id,
+                    'model': analysis['model'],
+                    'timestamp': analysis['analyzed_at'],
+                    'summary': summary['summary'],
+                    'num_respondents': summary['num_respondents']
+                }
+
+def encode_csv(records):
+    """Encode records as CSV, yielding text in batches of rows"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for i, record in enumerate(records, 1):
+        writer.writerow(record)
+        if i % EXPORT_BATCH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def encode_ndjson(records):
+    """Encode records as newline-delimited JSON, yielding text in batches of rows"""
+    batch = []
+    for record in records:
+        batch.append(json.dumps(record) + '\n')
+        if len(batch) >= EXPORT_BATCH_ROWS:
+            yield ''.join(batch)
+            batch = []
+    yield ''.join(batch)
+
+def gzip_stream(chunks):
+    """Compress a stream of text chunks into a gzip stream"""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.route('/api/survey/export')
+def export_surveys():
+    """
+    Stream surveys, their responses and cached analyses as CSV or NDJSON.
+    Exports one session's surveys and requires that session's presenter key.
+    Query parameters: format (csv or ndjson), gzip (1 to compress),
+    session_id (defaults to the default session), survey_id (repeatable,
+    defaults to all of the session's surveys) and since/until
+    (Unix timestamps bounding response and summary times).
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Format must be "csv" or "ndjson"'}), 400
+    
+    since = request.args.get('since', type=float)
+    until = request.args.get('until', type=float)
+    if ('since' in request.args and since is None) or ('until' in request.args and until is None):
+        return jsonify({'error': 'since and until must be Unix timestamps'}), 400
+    
+    session_id = request.args.get('session_id', DEFAULT_SESSION)
+    if session_id not in sessions:
+        return jsonify({'error': 'Session not found'}), 404
+    if not has_presenter_key(session_id):
+        return jsonify({'error': 'Presenter key required'}), 403
+    
+    survey_ids = request.args.getlist('survey_id') or list(sessions[session_id]['surveys'])
+    missing = [survey_id for survey_id in survey_ids
+               if survey_id not in surveys or surveys[survey_id]['session_id'] != session_id]
+    if missing:
+        return jsonify({'error': f'Survey not found: {", ".join(missing)}'}), 404
+    
+    records = generate_export_records(survey_ids, since, until)
+    if export_format == 'csv':
+        chunks, mimetype, extension = encode_csv(records), 'text/csv', 'csv'
+    else:
+        chunks, mimetype, extension = encode_ndjson(records), 'application/x-ndjson', 'ndjson'
+    
+    filename = f'surveys.{extension}'
+    if request.args.get('gzip') == '1':
+        chunks = gzip_stream(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    
+    # No Content-Length is set, so the body is sent with chunked transfer encoding
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
 @app.route('/api/survey/<survey_id>/close', methods=['POST'])
 def close_survey(survey_id):
     if survey_id in surveys:
+        if not has_presenter_key(surveys[survey_id]['session_id']):
+            return jsonify({'error': 'Presenter key required'}), 403
         surveys[survey_id]['active'] = False
         # Notify all users on the survey page that it's closed
         socketio.emit('survey_closed', {'survey_id': survey_id}, room=f'survey_{survey_id}')
     return jsonify({'success': True})
 
+@app.route('/api/admission/stats')
+def get_admission_stats():
+    """Get counts of requests and events rejected by admission control"""
+    with rate_lock:
+        rejections = dict(rate_rejections)
+    return jsonify({
+        'rejections': rejections,
+        'total': sum(rejections.values())
+    })
+
 # Socket.IO events
+def leave_current_session():
+    """Detach the current client from the session it joined, giving up the presenter role"""
+    session_id = socket_sessions.pop(request.sid, None)
+    session = sessions.get(session_id)
+    if session is None:
+        return
+    with rate_lock:
+        if session['presenter_sid'] == request.sid:
+            session['presenter_sid'] = None
+    leave_room(session_room(session_id, 'presenter'))
+    leave_room(session_room(session_id, 'viewer'))
+
+def viewer_room():
+    """Get the viewer room of the session the current client joined"""
+    return session_room(socket_sessions[request.sid], 'viewer')
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    # Refuse clients that reconnect repeatedly to get fresh per-connection buckets
+    if check_rate_limit('connect', request.remote_addr):
+        return False
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    leave_current_session()
+    with rate_lock:
+        rate_notices.pop(request.sid, None)
+        for kind in RATE_LIMITS:
+            rate_buckets.pop((kind, request.sid), None)
+
 @socketio.on('join_presenter')
-def join_presenter():
-    join_room('presenter')
-    emit('joined', {'room': 'presenter'})
+@admit_socket_event('join', presenter_only=False, per_address=True)
+def join_presenter(data=None):
+    session_id = (data or {}).get('session_id', DEFAULT_SESSION)
+    if session_id not in sessions:
+        emit('event_rejected', {'event': 'join_presenter', 'reason': 'session_not_found'})
+        return
+    if not has_presenter_key(session_id, (data or {}).get('presenter_key', '')):
+        with rate_lock:
+            rate_rejections['not_presenter'] += 1
+        emit('event_rejected', {'event': 'join_presenter', 'reason': 'invalid_key'})
+        return
+    if socket_sessions.get(request.sid) != session_id:
+        leave_current_session()
+    
+    # A valid key takes over from any earlier presenter, e.g. a connection that
+    # dropped before the server noticed
+    session = sessions[session_id]
+    with rate_lock:
+        previous_sid = session['presenter_sid']
+        session['presenter_sid'] = request.sid
+    if previous_sid is not None and previous_sid != request.sid:
+        emit('presenter_replaced', {'session_id': session_id}, room=previous_sid)
+    socket_sessions[request.sid] = session_id
+    join_room(session_room(session_id, 'presenter'))
+    emit('joined', {'room': 'presenter', 'session_id': session_id})
 
 @socketio.on('join_viewer')
-def join_viewer():
-    join_room('viewer')
-    emit('joined', {'room': 'viewer'})
+@admit_socket_event('join', presenter_only=False, per_address=True)
+def join_viewer(data=None):
+    session_id = (data or {}).get('session_id', DEFAULT_SESSION)
+    if session_id not in sessions:
+        emit('event_rejected', {'event': 'join_viewer', 'reason': 'session_not_found'})
+        return
+    if socket_sessions.get(request.sid) != session_id:
+        leave_current_session()
+    socket_sessions[request.sid] = session_id
+    join_room(session_room(session_id, 'viewer'))
+    emit('joined', {'room': 'viewer', 'session_id': session_id})
 
 @socketio.on('join_survey')
+@admit_socket_event('join', presenter_only=False, per_address=True)
 def join_survey(data):
     survey_id = data.get('survey_id')
     if survey_id:
@@ -322,51 +1039,61 @@ def join_survey(data):
         emit('joined', {'room': f'survey_{survey_id}'})
 
 @socketio.on("presentation_loaded")
+@admit_socket_event('presentation_loaded')
 def handle_presentation_loaded(data):
     # Broadcast to all viewers that they should load the presentation
-    emit("presentation_loaded", data, room='viewer')
+    emit("presentation_loaded", data, room=viewer_room())
 
 @socketio.on("slide_change")
+@admit_socket_event('slide_change')
 def handle_slide_change(data):
     # Broadcast to all viewers
-    emit("slide_change", data, room='viewer')
+    emit("slide_change", data, room=viewer_room())
 
 @socketio.on("annotation_update")
+@admit_socket_event('annotation_update')
 def handle_annotation_update(data):
     # Broadcast to all viewers
-    emit("annotation_update", data, room='viewer')
+    emit("annotation_update", data, room=viewer_room())
 
 @socketio.on("clear_annotations")
+@admit_socket_event('clear_annotations')
 def handle_clear_annotations():
-    emit("clear_annotations", room='viewer')
+    emit("clear_annotations", room=viewer_room())
 
 @socketio.on("video_action")
+@admit_socket_event('video_action')
 def handle_video_action(data):
     # Broadcast video play/pause to all viewers
-    emit("video_action", data, room='viewer')
+    emit("video_action", data, room=viewer_room())
 
 @socketio.on("model_interaction")
+@admit_socket_event('model_interaction')
 def handle_model_interaction(data):
     # Broadcast 3D model interactions to all viewers
-    emit("model_interaction", data, room='viewer')
+    emit("model_interaction", data, room=viewer_room())
 
 @socketio.on("survey_show")
+@admit_socket_event('survey_show')
 def handle_survey_show(data):
     # Broadcast to all viewers
-    emit("survey_show", data, room='viewer')
+    emit("survey_show", data, room=viewer_room())
 
 @socketio.on("survey_close")
+@admit_socket_event('survey_close')
 def handle_survey_close(data=None):
     # Broadcast to all viewers
-    emit("survey_close", room='viewer')
+    emit("survey_close", room=viewer_room())
     
     # Also close the survey and notify respondents
     if data and 'survey_id' in data:
         survey_id = data['survey_id']
-        if survey_id in surveys:
+        # Presenters may only close surveys from their own session
+        if survey_id in surveys and surveys[survey_id]['session_id'] == socket_sessions[request.sid]:
             surveys[survey_id]['active'] = False
             # Notify all users on the survey response page
             emit('survey_closed', {'survey_id': survey_id}, room=f'survey_{survey_id}')
 
 if __name__ == '__main__':
+    print(f"Presenter URL: http://localhost:5000/?key={DEFAULT_PRESENTER_KEY}")
     socketio.run(app, host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -1,6 +1,5 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from transformers import pipeline
-import math
 import time
 
 # Load summarization model
@@ -10,13 +9,14 @@ summarizer = pipeline(
     device=-1
 )
 
-def summarize(responses: List[str], num_summaries: int) -> List[Tuple[str, int]]:
+def summarize(responses: List[str], num_summaries: int, weights: Optional[List[int]] = None) -> List[Tuple[str, int]]:
     """
     Summarize survey responses.
 
     Args:
         responses: List of response text strings
         num_summaries: Number of summaries to generate
+        weights: Optional number of respondents each response represents
 
     Returns:
         List of tuples containing (summary, num_respondents)
@@ -24,13 +24,18 @@ def summarize(responses: List[str], num_summaries: int) -> List[Tuple[str, int]]
     if num_summaries <= 0 or not responses:
         return []
 
+    if weights is None:
+        weights = [1] * len(responses)
+
     summaries = []
-    chunk_size = math.ceil(len(responses) / num_summaries)
+    num_summaries = min(num_summaries, len(responses))
 
     for i in range(num_summaries):
-        chunk = responses[i * chunk_size:(i + 1) * chunk_size]
-        if not chunk:
-            break
+        # Spread responses evenly so no chunk is empty
+        start = i * len(responses) // num_summaries
+        end = (i + 1) * len(responses) // num_summaries
+        chunk = responses[start:end]
+        chunk_weight = sum(weights[start:end])
 
         # Combine responses into a single document
         text = " ".join(chunk)
@@ -52,7 +57,7 @@ def summarize(responses: List[str], num_summaries: int) -> List[Tuple[str, int]]
         # Clean up the summary - remove quotes and extra whitespace
         summary_text = result.strip().strip('"\'')
         
-        summaries.append((summary_text, len(chunk)))
+        summaries.append((summary_text, chunk_weight))
 
     # Optional: simulate latency
     time.sleep(1)
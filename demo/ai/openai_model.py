@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import os
 from openai import OpenAI
 
@@ -9,7 +9,7 @@ if not os.getenv("OPENAI_API_KEY"):
     raise ValueError("OPENAI_API_KEY environment variable not set")
 
 
-def summarize(responses: List[str], num_summaries: int) -> List[Tuple[str, int]]:
+def summarize(responses: List[str], num_summaries: int, weights: Optional[List[int]] = None) -> List[Tuple[str, int]]:
     """
     Summarize survey responses by grouping them into `num_summaries` thematic clusters.
     Returns one concise summary sentence per group (max 280 characters) and the count
@@ -18,6 +18,7 @@ def summarize(responses: List[str], num_summaries: int) -> List[Tuple[str, int]]
     Args:
         responses: List of response text strings
         num_summaries: Number of thematic summaries to generate
+        weights: Optional number of respondents each response represents
 
     Returns:
         List of tuples (summary, count)
@@ -25,7 +26,12 @@ def summarize(responses: List[str], num_summaries: int) -> List[Tuple[str, int]]
     if num_summaries <= 0 or not responses:
         return []
 
-    text = "\n".join([f"- {resp}" for resp in responses])
+    if weights is None:
+        weights = [1] * len(responses)
+    total = sum(weights)
+
+    # Near-duplicate responses arrive collapsed; annotate how many each one stands for
+    text = "\n".join([f"- {resp}" if w == 1 else f"- {resp} (x{w})" for resp, w in zip(responses, weights)])
 
     prompt = f"""You are analyzing a large set of survey responses.
 
@@ -33,13 +39,13 @@ Task:
 1. Group these responses into exactly {num_summaries} distinct thematic clusters.
 2. For each group, write ONE concise summary sentence capturing the main idea.
 3. Summaries must be factual, neutral, consistent in tone, and under 280 characters.
-4. Include the count of responses in each group.
+4. Include the count of responses in each group. A response marked (xN) counts as N responses.
 5. Do NOT use quotation marks or phrases like "Respondents said" or "This group shows".
 6. Return ONLY a Python-style list of tuples in this format:
 
 (summary, count)
 
-Survey responses ({len(responses)} total):
+Survey responses ({total} total):
 {text}
 
 Begin.
@@ -82,10 +88,10 @@ Begin.
                 summaries = [(str(s), int(c)) for s, c in summaries]
         except Exception:
             # Fallback: return as a single error tuple
-            summaries = [(f"Error parsing model output: {result_text}", len(responses))]
+            summaries = [(f"Error parsing model output: {result_text}", total)]
 
         return summaries
 
     except Exception as e:
         print(f"OpenAI API error: {e}")
-        return [(f"Error generating summaries: {e}", len(responses))]
+        return [(f"Error generating summaries: {e}", total)]
@@ -167,7 +167,8 @@ def main():
     
     try:
         # Import and run the Flask app
-        from app import app
+        from app import app, DEFAULT_PRESENTER_KEY
+        print_info(f"Presenter URL (keep private): http://localhost:{port}/?key={DEFAULT_PRESENTER_KEY}")
         print(f"{Colors.GREEN}Server is running! Press Ctrl+C to quit.{Colors.ENDC}\n")
         app.run(host='0.0.0.0', port=port, debug=False)
     except KeyboardInterrupt:
@@ -8,12 +8,40 @@ import { renderWidgets, cleanupWidgets, updateWidgetPositions } from './iframe-w
 import { Modal } from './beamer_modal.js';
 import { setControlsEnabledAfterUpload, disableControlButtons } from './beamer_ui.js';
 
+// Presentation session from a /s/<session_id> URL; the server's default session otherwise
+const sessionMatch = window.location.pathname.match(/^\/s\/([^/]+)/);
+const sessionId = sessionMatch ? sessionMatch[1] : 'default';
+const sessionApi = sessionMatch ? `/api/session/${sessionId}` : '/api';
+// Presenter key from the ?key= query parameter printed by the server
+const presenterKey = new URLSearchParams(window.location.search).get('key') || '';
+const presenterHeaders = { 'X-Presenter-Key': presenterKey };
+
 const socket = io();
-socket.emit('join_presenter');
+// Re-join on every (re)connect, since the server tracks the presenter by socket id
+socket.on('connect', () => socket.emit('join_presenter', { session_id: sessionId, presenter_key: presenterKey }));
+let presenterRejectionShown = false;
+socket.on('event_rejected', (data) => {
+    console.warn('Event rejected by server:', data);
+    // Without the presenter role nothing reaches the viewers, so say so once
+    if (data.event === 'join_presenter' && !presenterRejectionShown) {
+        presenterRejectionShown = true;
+        if (data.reason === 'invalid_key') {
+            Modal.error('Not Presenting', 'This page was opened without a valid presenter key, so viewers will not follow it. Open the presenter URL printed by the server.');
+        } else if (data.reason === 'session_not_found') {
+            Modal.error('Not Presenting', 'This presentation session does not exist on the server.');
+        }
+    }
+});
+socket.on('presenter_replaced', () => {
+    Modal.warning('Presenter Replaced', 'Another window took over as presenter. Viewers now follow that window.');
+});
 
 // Available AI models (loaded from presentation ZIP)
 let availableModels = [];
 
+// Minimum time between 3D model camera updates sent to viewers (~20 per second)
+const MODEL_SYNC_INTERVAL_MS = 50;
+
 window.addEventListener("DOMContentLoaded", () => {
 
 const timerContainer = document.getElementById("timer-container");
@@ -492,23 +520,30 @@ async function renderSlide(slideIndex) {
             mv.style.height = `${m.height * containerRect.height}px`;
             mv.style.zIndex = m.zIndex || 5;
             
+            // camera-change fires every frame while dragging or auto-rotating;
+            // send at most one update per interval, carrying the latest camera
+            let cameraSyncTimeout = null;
             mv.addEventListener('camera-change', () => {
-                const camera = mv.getCameraOrbit();
-                const target = mv.getCameraTarget();
-                socket.emit('model_interaction', {
-                    modelId: m.id,
-                    slideIndex: currentSlide,
-                    camera: {
-                        theta: camera.theta,
-                        phi: camera.phi,
-                        radius: camera.radius
-                    },
-                    target: {
-                        x: target.x,
-                        y: target.y,
-                        z: target.z
-                    }
-                });
+                if (cameraSyncTimeout) return;
+                cameraSyncTimeout = setTimeout(() => {
+                    cameraSyncTimeout = null;
+                    const camera = mv.getCameraOrbit();
+                    const target = mv.getCameraTarget();
+                    socket.emit('model_interaction', {
+                        modelId: m.id,
+                        slideIndex: currentSlide,
+                        camera: {
+                            theta: camera.theta,
+                            phi: camera.phi,
+                            radius: camera.radius
+                        },
+                        target: {
+                            x: target.x,
+                            y: target.y,
+                            z: target.z
+                        }
+                    });
+                }, MODEL_SYNC_INTERVAL_MS);
             });
             
             slide_canvas_container.appendChild(mv);
@@ -546,14 +581,23 @@ fileInput.addEventListener('change', async (e) => {
     formData.append('file', file);
 
     try {
-        const response = await fetch('/api/presentation/upload', {
+        const response = await fetch(`${sessionApi}/presentation/upload`, {
             method: 'POST',
+            headers: presenterHeaders,
             body: formData
         });
 
         const data = await response.json();
         console.log('Upload response:', data);
 
+        if (!response.ok) {
+            uploadModal.close();
+            Modal.error('Upload Failed', response.status === 403
+                ? 'This page was opened without a valid presenter key. Open the presenter URL printed by the server.'
+                : (data.error || 'Failed to upload presentation. Please try again.'));
+            return;
+        }
+
         if (data.success) {
             await loadAvailableModels();
 
@@ -604,7 +648,7 @@ fileInput.addEventListener('change', async (e) => {
 
 async function loadAvailableModels() {
     try {
-        const response = await fetch('/api/models');
+        const response = await fetch(`${sessionApi}/models`);
         const data = await response.json();
         availableModels = data.models || [];
         console.log('Available AI models:', availableModels);
@@ -728,9 +772,9 @@ surveyBtn.onClick(() => {
         }
         
         try {
-            const response = await fetch('/api/survey/create', {
+            const response = await fetch(`${sessionApi}/survey/create`, {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: { ...presenterHeaders, 'Content-Type': 'application/json' },
                 body: JSON.stringify({ 
                     question,
                     model,
@@ -899,7 +943,7 @@ surveyResultsBtn.onClick(async () => {
     
     // Close the survey if it's still open
     if (surveyOverlayVisible) {
-        await fetch(`/api/survey/${currentSurveyData.survey_id}/close`, { method: 'POST' });
+        await fetch(`/api/survey/${currentSurveyData.survey_id}/close`, { method: 'POST', headers: presenterHeaders });
         socket.emit('survey_close', { survey_id: currentSurveyData.survey_id });
         hideSurveyOverlay();
     }
@@ -908,7 +952,7 @@ surveyResultsBtn.onClick(async () => {
     const loadingModal = Modal.loading('Generating Summaries', 'Please wait while the responses are analyzed...');
     
     try {
-        const response = await fetch(`/api/survey/${currentSurveyData.survey_id}/responses`);
+        const response = await fetch(`/api/survey/${currentSurveyData.survey_id}/responses`, { headers: presenterHeaders });
         const data = await response.json();
         
         if (data.responses.length === 0) {
@@ -919,7 +963,7 @@ surveyResultsBtn.onClick(async () => {
         
         const analyzeResponse = await fetch(`/api/survey/${currentSurveyData.survey_id}/analyze`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' }
+            headers: { ...presenterHeaders, 'Content-Type': 'application/json' }
         });
         
         if (!analyzeResponse.ok) {